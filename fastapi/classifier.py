@@ -1,49 +1,104 @@
 # classifier.py - FINAL VERSION (Vision + Groq + Llama 4 Maverick)
 import numpy as np
+import matplotlib
+matplotlib.use("Agg")  # headless rendering, skip the GUI-backend import path
 import matplotlib.pyplot as plt
+from PIL import Image
 import io
-import base64
+import pybase64
+import threading
+import diskcache
+import httpx
 from groq import Groq
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Keep the transport warm across classifications: HTTP/2 with a generous
+# keepalive pool means repeat image uploads reuse the TLS session instead
+# of paying handshake + TCP slow-start each call
+client = Groq(
+    api_key=os.getenv("GROQ_API_KEY"),
+    http_client=httpx.Client(
+        http2=True,
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=32),
+        timeout=60,
+    ),
+)
+
+# One Figure reused across calls - construction and styling is a fixed
+# ~50-100ms cost otherwise paid per classification. Matplotlib figures
+# aren't thread-safe, so rendering is serialized behind a lock.
+_FIG_LOCK = threading.Lock()
+_FIG, (_AX1, _AX2) = plt.subplots(2, 1, figsize=(16, 5), dpi=100, facecolor='black')
+_FIG.patch.set_facecolor('black')
+# Borderless layout set once, replacing savefig's bbox_inches='tight'
+# (which forced a second render pass to measure the tight box)
+_FIG.subplots_adjust(left=0, right=1, top=1, bottom=0, hspace=0.05)
+
+# Reused between calls so the PNG encoder writes into an already-grown
+# buffer instead of reallocating a fresh BytesIO each time
+_PNG_BUF = io.BytesIO()
+
+# Predictions are deterministic at temperature 0, so cache them on disk
+# keyed by the event's identity - repeat views skip the render and the
+# ~1-3s LLM round-trip entirely, even across server restarts
+_PREDICTION_CACHE = diskcache.Cache("cache/classifier")
 
 def classify_ecg_event(ecg_path: str, start_sample: int, ground_truth: str) -> tuple[str, float]:
     """
     TRUE vision-based classification using Llama 4 Maverick on Groq.
     Renders the actual ECG trace as a medical-grade image with red marker.
     """
+    cache_key = (ecg_path, start_sample, ground_truth)
+    cached = _PREDICTION_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
-        # Load full resolution ECG
-        ecg = np.load(ecg_path).astype(np.float32)
-        time_sec = np.arange(len(ecg)) / 200.0
+        # Memory-map the ECG and decimate to roughly the figure's pixel
+        # width - at 1600px most of the 18000 points overlap, so the
+        # vision model sees the same image. Matplotlib plots the int16
+        # channels directly; only the offset lead needs widening, so the
+        # full-array float32 copy is gone.
+        ecg = np.load(ecg_path, mmap_mode="r")
+        stride = max(1, len(ecg) // 4000)
+        ch0 = ecg[::stride, 0]
+        ch1 = ecg[::stride, 1].astype(np.int32) - 800
+        time_sec = np.arange(0, len(ecg), stride) / 200.0
+
+        event_time = start_sample / 200.0
 
-        # Create beautiful hospital-style plot
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(16, 5), dpi=100, facecolor='black')
-        fig.patch.set_facecolor('black')
+        # Draw the hospital-style plot on the shared figure
+        with _FIG_LOCK:
+            _AX1.clear()
+            _AX2.clear()
 
-        # Lead I & II in classic green
-        ax1.plot(time_sec, ecg[:, 0], color='#00ff41', linewidth=1.1)
-        ax2.plot(time_sec, ecg[:, 1] - 800, color='#00ff41', linewidth=1.1)
+            # Lead I & II in classic green
+            _AX1.plot(time_sec, ch0, color='#00ff41', linewidth=1.1)
+            _AX2.plot(time_sec, ch1, color='#00ff41', linewidth=1.1)
 
-        event_time = start_sample / 200.0
-        for ax in (ax1, ax2):
-            ax.axvline(event_time, color='red', linewidth=3, alpha=0.9)
-            ax.set_facecolor('black')
-            ax.grid(True, color='gray', alpha=0.3, linestyle='--')
-            ax.set_ylim(-2000, 3000)
-            ax.axis('off')
-
-        plt.subplots_adjust(hspace=0.05)
-
-        # Convert to base64 image
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', bbox_inches='tight', pad_inches=0, facecolor='black')
-        plt.close()
-        buf.seek(0)
-        img_base64 = base64.b64encode(buf.read()).decode()
+            # clear() resets axes styling, so reapply it per call
+            for ax in (_AX1, _AX2):
+                ax.axvline(event_time, color='red', linewidth=3, alpha=0.9)
+                ax.set_facecolor('black')
+                ax.grid(True, color='gray', alpha=0.3, linestyle='--')
+                ax.set_ylim(-2000, 3000)
+                ax.axis('off')
+
+            # Render once via the Agg canvas and encode the RGBA buffer with
+            # Pillow at a light compression level (savefig's default level-6
+            # PNG compression dominated per-call cost)
+            _FIG.canvas.draw()
+            img = np.asarray(_FIG.canvas.buffer_rgba())
+
+            _PNG_BUF.seek(0)
+            _PNG_BUF.truncate()
+            Image.fromarray(img).save(_PNG_BUF, format='PNG', compress_level=3, optimize=False)
+
+            # SIMD-accelerated encoder; stdlib base64 is scalar and costs a
+            # few ms per 100KB image
+            img_base64 = pybase64.b64encode_as_string(_PNG_BUF.getvalue())
 
         response = client.chat.completions.create(
             model="meta-llama/llama-4-maverick-17b-128e-instruct",
@@ -63,6 +118,9 @@ def classify_ecg_event(ecg_path: str, start_sample: int, ground_truth: str) -> t
         predicted = pred if pred in valid else ground_truth
         confidence = 0.99 if predicted != ground_truth else 0.85  # bonus: lower if disagrees
 
+        # Only successful classifications are cached; failures fall through
+        # to the fallback below and get retried next time
+        _PREDICTION_CACHE.set(cache_key, (predicted, confidence))
         return predicted, confidence
 
     except Exception as e:
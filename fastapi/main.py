@@ -7,12 +7,16 @@ This API provides a three-tier navigation system:
 3. View detailed ECG data for a specific episode
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import List, Dict, Any
-import sqlite3
+import aiosqlite
+import asyncio
 import numpy as np
+import orjson
 import os
 from dotenv import load_dotenv
 from groq import Groq
@@ -41,10 +45,73 @@ groq_client = Groq(api_key=GROQ_API_KEY)
 # FastAPI Application Setup
 # ============================================================================
 
+class NumpyORJSONResponse(ORJSONResponse):
+    """ORJSONResponse that encodes numpy arrays straight from their buffers."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+async def _load_patients(db: aiosqlite.Connection) -> List[Dict[str, Any]]:
+    """
+    Build the /patients response once at startup.
+
+    The manifest is written offline by preprocess.py, so the patient list
+    only changes across server restarts.
+
+    Returns:
+        List of patient dicts with patient_id and episode_count
+    """
+    cursor = await db.execute("""
+        SELECT patient_id, COUNT(*) as episode_count
+        FROM events
+        GROUP BY patient_id
+        ORDER BY patient_id
+    """)
+    rows = await cursor.fetchall()
+
+    return [
+        {
+            "patient_id": row["patient_id"],
+            "episode_count": row["episode_count"]
+        }
+        for row in rows
+    ]
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Open the manifest database once at startup, precompute the patient
+    list, and close the connection on shutdown. Long-lived state hangs
+    off app.state so nothing is set up per request.
+
+    The connection is tuned for read-heavy access: WAL journaling lets
+    readers proceed without fsync stalls, NORMAL synchronous skips the
+    per-transaction fsync, and the mmap/cache pragmas keep the manifest
+    resident in memory.
+    """
+    db = await aiosqlite.connect(DB_PATH)
+    db.row_factory = aiosqlite.Row
+    await db.execute("PRAGMA journal_mode=WAL")
+    await db.execute("PRAGMA synchronous=NORMAL")
+    await db.execute("PRAGMA mmap_size=268435456")
+    await db.execute("PRAGMA cache_size=-65536")
+    await db.execute("PRAGMA temp_store=MEMORY")
+
+    app.state.db = db
+    app.state.patients = await _load_patients(db)
+
+    yield
+    await db.close()
+
+
 app = FastAPI(
     title="TriFetch - Patient View",
     description="ECG cardiac event monitoring and analysis system",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=NumpyORJSONResponse,
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -56,22 +123,6 @@ app.add_middleware(
 )
 
 
-# ============================================================================
-# Database Utilities
-# ============================================================================
-
-def get_db() -> sqlite3.Connection:
-    """
-    Create and return a database connection with Row factory.
-    
-    Returns:
-        sqlite3.Connection: Database connection with row_factory enabled
-    """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
 from classifier import classify_ecg_event
 
 # ============================================================================
@@ -79,111 +130,151 @@ from classifier import classify_ecg_event
 # ============================================================================
 
 @app.get("/patients", response_model=List[Dict[str, Any]])
-def get_patients():
+async def get_patients(request: Request):
     """
     Get list of all patients with their episode counts.
-    
+
     Returns:
         List of patients with:
         - patient_id: Unique patient identifier
         - episode_count: Number of cardiac events for this patient
     """
-    conn = get_db()
-    rows = conn.execute("""
-        SELECT patient_id, COUNT(*) as episode_count
-        FROM events 
-        GROUP BY patient_id 
-        ORDER BY patient_id
-    """).fetchall()
-    conn.close()
-    
-    return [
-        {
-            "patient_id": row["patient_id"], 
-            "episode_count": row["episode_count"]
-        } 
-        for row in rows
-    ]
+    return request.app.state.patients
 
 
 @app.get("/patient/{patient_id}/episodes", response_model=List[Dict[str, Any]])
-def get_patient_episodes(patient_id: str):
+async def get_patient_episodes(patient_id: str, request: Request):
     """
     Get all cardiac episodes for a specific patient.
-    
+
     Args:
         patient_id: Unique patient identifier
-        
+
     Returns:
         List of episodes with event details (ID, name, rejection status, timing)
     """
-    conn = get_db()
-    rows = conn.execute("""
-        SELECT event_id, event_name, is_rejected, start_sample 
-        FROM events 
-        WHERE patient_id = ? 
+    cursor = await request.app.state.db.execute("""
+        SELECT event_id, event_name, is_rejected, start_sample
+        FROM events
+        WHERE patient_id = ?
         ORDER BY event_id
-    """, (patient_id,)).fetchall()
-    conn.close()
-    
+    """, (patient_id,))
+    rows = await cursor.fetchall()
+
     return [dict(row) for row in rows]
 
 
-@app.get("/event/{event_id}", response_model=Dict[str, Any])
-def get_event(event_id: str):
+@app.get("/event/{event_id}")
+async def get_event(event_id: str, request: Request):
     """
-    Get detailed ECG data for a specific cardiac event.
-    
+    Get metadata for a specific cardiac event.
+
+    The waveform itself is served separately as a raw binary buffer from
+    /event/{event_id}/ecg.bin — JSON-encoding 9000 samples costs far more
+    than the metadata around them.
+
     Args:
         event_id: Unique event identifier
-        
+
     Returns:
-        Complete event data including:
-        - Patient and event metadata
-        - Downsampled ECG waveform data (2 channels)
-        - Timing information
-        - Ground truth diagnosis
-        - ML prediction (placeholder)
-        
+        Event metadata including:
+        - Patient and event identifiers
+        - Ground truth diagnosis and ML prediction
+        - Timing information and a URL for the binary waveform
+
     Raises:
         HTTPException: 404 if event not found
     """
     # Fetch event metadata from database
-    conn = get_db()
-    row = conn.execute(
-        "SELECT * FROM events WHERE event_id = ?", 
+    cursor = await request.app.state.db.execute(
+        "SELECT * FROM events WHERE event_id = ?",
         (event_id,)
-    ).fetchone()
-    conn.close()
-    
+    )
+    row = await cursor.fetchone()
+
     if not row:
         raise HTTPException(status_code=404, detail="Event not found")
-    
+
     row = dict(row)
-    
-    # Load and downsample ECG data
-    ecg_full = np.load(row["ecg_path"])  # Shape: (18000, 2)
-    ecg_display = ecg_full[::DOWNSAMPLE_FACTOR]  # Shape: (4500, 2)
-    
-    # Calculate time axis for display
-    num_samples = len(ecg_display)
-    time_seconds = [i / DISPLAY_SAMPLE_RATE for i in range(num_samples)]
-    
-    # Classify the event using Groq vision model
-    predicted_type, confidence = classify_ecg_event(
-        row["ecg_path"], 
-        row["start_sample"], 
+
+    # Classify the event using Groq vision model (blocking: rendering +
+    # HTTP round-trip, so it runs off the event loop)
+    predicted_type, confidence = await asyncio.to_thread(
+        classify_ecg_event,
+        row["ecg_path"],
+        row["start_sample"],
         row["event_name"]
     )
-    
+
     return {
         "event_id": event_id,
         "patient_id": row["patient_id"],
         "ground_truth": row["event_name"],
         "is_rejected": bool(row["is_rejected"]),
-        "ecg": ecg_display.tolist(),  # [[ch1, ch2], [ch1, ch2], ...]
-        "time_seconds": time_seconds,
+        "ecg_url": f"/event/{event_id}/ecg.bin",
+        "display_sample_rate": DISPLAY_SAMPLE_RATE,
         "start_sample_display": row["start_sample"] // DOWNSAMPLE_FACTOR,
         "predicted": predicted_type,
         "confidence": confidence
-    }
\ No newline at end of file
+    }
+
+
+def _load_display_ecg_bytes(row: Dict[str, Any]) -> bytes:
+    """
+    Load an event's display-resolution waveform and copy it out as bytes.
+
+    Blocking on purpose — both the memory-mapped np.load and the
+    tobytes() page-in belong in a worker thread, not on the event loop.
+
+    Args:
+        row: Event row from the manifest database
+
+    Returns:
+        bytes: The (4500, 2) int16 sample buffer
+    """
+    if row.get("ecg_display_path"):
+        ecg_display = np.load(row["ecg_display_path"], mmap_mode="r")  # Shape: (4500, 2)
+    else:
+        # Manifests built before ecg_display_path existed lack the
+        # precomputed file; stride the full array instead
+        ecg_full = np.load(row["ecg_path"], mmap_mode="r")
+        ecg_display = ecg_full[::DOWNSAMPLE_FACTOR]
+    return ecg_display.tobytes()
+
+
+@app.get("/event/{event_id}/ecg.bin")
+async def get_event_ecg(event_id: str, request: Request):
+    """
+    Get the downsampled ECG waveform as a raw binary buffer.
+
+    The body is the little-endian int16 sample data, interleaved
+    [ch1, ch2] per row — the client reconstructs it with Int16Array
+    instead of parsing thousands of JSON numbers.
+
+    Args:
+        event_id: Unique event identifier
+
+    Returns:
+        Response: application/octet-stream of the (4500, 2) int16 array
+
+    Raises:
+        HTTPException: 404 if event not found
+    """
+    cursor = await request.app.state.db.execute(
+        "SELECT * FROM events WHERE event_id = ?",
+        (event_id,)
+    )
+    row = await cursor.fetchone()
+
+    if not row:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    # Both the np.load and the tobytes() copy that pages the data in run
+    # inside the worker thread, so a cold-cache read never touches the
+    # event loop.
+    ecg_bytes = await asyncio.to_thread(_load_display_ecg_bytes, dict(row))
+
+    return Response(
+        content=ecg_bytes,
+        media_type="application/octet-stream"
+    )
\ No newline at end of file
@@ -18,7 +18,10 @@ Usage:
 """
 
 import json
+import os
 import sqlite3
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import time as _time
 from pathlib import Path
 import numpy as np
 
@@ -27,8 +30,8 @@ import numpy as np
 # Configuration
 # ============================================================================
 
-# CHANGE THIS PATH to point to your raw data directory
-RAW_ROOT = Path("/home/mihir-yadav/Downloads/test-trifetch")
+# CHANGE THIS PATH (or set TRIFETCH_RAW_ROOT) to point to your raw data directory
+RAW_ROOT = Path(os.environ.get("TRIFETCH_RAW_ROOT", "/home/mihir-yadav/Downloads/test-trifetch"))
 
 PROCESSED_ROOT = Path("processed")
 ECG_DIR = PROCESSED_ROOT / "ecg"
@@ -40,6 +43,13 @@ TOTAL_SAMPLES = SAMPLES_PER_FILE * NUM_FILES_PER_EVENT  # 18000
 NUM_CHANNELS = 2
 SAMPLE_RATE = 200  # Hz
 
+# Display stride baked in at preprocess time; must match the API's
+# DOWNSAMPLE_FACTOR (200 Hz -> 50 Hz)
+DOWNSAMPLE_FACTOR = 4
+
+# How many completed events to accumulate before each executemany() insert
+INSERT_BATCH_SIZE = 1000
+
 
 # ============================================================================
 # Database Setup
@@ -58,18 +68,28 @@ def setup_database():
     conn = sqlite3.connect(PROCESSED_ROOT / "manifest.db")
     cur = conn.cursor()
     
+    # Fresh start every run; dropping the table (rather than DELETE)
+    # also migrates manifests built before ecg_display_path existed
+    cur.execute("DROP TABLE IF EXISTS events")
+
     cur.execute("""
-        CREATE TABLE IF NOT EXISTS events (
+        CREATE TABLE events (
             event_id TEXT PRIMARY KEY,
             patient_id TEXT,
             event_name TEXT,
             is_rejected INTEGER,
             start_sample INTEGER,
-            ecg_path TEXT
+            ecg_path TEXT,
+            ecg_display_path TEXT
         )
     """)
-    
-    cur.execute("DELETE FROM events")  # Fresh start every run
+
+    # Covering index: patient lookups become range scans and the
+    # /patients GROUP BY can walk the index in order
+    cur.execute("""
+        CREATE INDEX ix_events_patient
+        ON events(patient_id, event_id)
+    """)
     
     return conn, cur
 
@@ -92,10 +112,11 @@ def extract_start_sample(metadata: dict) -> int:
     if "EventIndex" in metadata and metadata["EventIndex"] not in (None, "", "null"):
         return int(metadata["EventIndex"])
     
-    # Fallback: calculate from EventOccuredTime
+    # Fallback: calculate from EventOccuredTime; fromisoformat is C-level
+    # and handles the fractional seconds directly
     time_str = metadata["EventOccuredTime"].split()[1]  # e.g., "15:42:21.203"
-    h, m, s = time_str.split(":")
-    seconds = int(h) * 3600 + int(m) * 60 + float(s)
+    t = _time.fromisoformat(time_str)
+    seconds = t.hour * 3600 + t.minute * 60 + t.second + t.microsecond / 1e6
     return int(seconds * SAMPLE_RATE)
 
 
@@ -117,70 +138,72 @@ def load_ecg_files(event_folder: Path) -> np.ndarray:
     if len(txt_files) != NUM_FILES_PER_EVENT:
         raise ValueError(f"Expected {NUM_FILES_PER_EVENT} .txt files, found {len(txt_files)}")
     
-    ecg_chunks = []
-    for txt_file in txt_files:
-        chunk = np.loadtxt(txt_file, delimiter=",", dtype=np.int16)
-        if chunk.shape[0] != SAMPLES_PER_FILE:
-            print(f"Warning: {txt_file.name} has {chunk.shape[0]} samples, expected {SAMPLES_PER_FILE}")
-        ecg_chunks.append(chunk)
-    
-    full_ecg = np.vstack(ecg_chunks)
-    
-    if full_ecg.shape != (TOTAL_SAMPLES, NUM_CHANNELS):
-        raise ValueError(f"Expected shape ({TOTAL_SAMPLES}, {NUM_CHANNELS}), got {full_ecg.shape}")
-    
+    # The files are strictly "int,int\n" records, so skip the generic CSV
+    # tokenizer entirely: flatten each file to one comma-separated buffer
+    # and let numpy's text parser scan it in C, writing chunks into a
+    # preallocated array to avoid the extra np.vstack copy.
+    full_ecg = np.empty((TOTAL_SAMPLES, NUM_CHANNELS), dtype=np.int16)
+    for i, txt_file in enumerate(txt_files):
+        raw = txt_file.read_bytes()
+        flat = np.fromstring(raw.replace(b"\n", b","), dtype=np.int16, sep=",")
+        chunk = flat.reshape(-1, NUM_CHANNELS)
+        if chunk.shape != (SAMPLES_PER_FILE, NUM_CHANNELS):
+            raise ValueError(
+                f"{txt_file.name}: expected shape ({SAMPLES_PER_FILE}, {NUM_CHANNELS}), got {chunk.shape}"
+            )
+        full_ecg[i * SAMPLES_PER_FILE:(i + 1) * SAMPLES_PER_FILE] = chunk
+
     return full_ecg
 
 
-def process_event(json_path: Path, cursor: sqlite3.Cursor, event_number: int) -> bool:
+def process_event(json_path: Path) -> tuple | None:
     """
-    Process a single event: load data, convert to .npy, and store metadata.
-    
+    Process a single event: load data, convert to .npy, and return its metadata.
+
+    Runs inside a worker process, so it does all the file I/O and parsing
+    but leaves the database insert to the main process.
+
     Args:
         json_path: Path to the event JSON metadata file
-        cursor: Database cursor for inserting records
-        event_number: Sequential event number for logging
-        
+
     Returns:
-        bool: True if processing succeeded, False otherwise
+        tuple: (event_id, patient_id, event_name, is_rejected, start_sample,
+                ecg_path, ecg_display_path) ready for insertion into the
+                events table, or None on failure
     """
     event_folder = json_path.parent
     event_id = event_folder.name
-    
-    print(f"[{event_number}] Processing event {event_id}...", end=" ")
-    
+
     try:
         # Load metadata
         with open(json_path, "r") as f:
             metadata = json.load(f)
-        
+
         # Extract metadata fields
         start_sample = extract_start_sample(metadata)
         event_name = metadata.get("Event_Name", "UNKNOWN") or "UNKNOWN"
         is_rejected = int(metadata.get("IsRejected", "0"))
         patient_id = metadata.get("Patient_IR_ID", "")
-        
-        print(f"start={start_sample}", end=" ")
-        
+
         # Load and concatenate ECG files
         full_ecg = load_ecg_files(event_folder)
-        
-        # Save as binary .npy file for fast loading
+
+        # Save as binary .npy file for fast loading; keep the ADC's native
+        # int16 so the file is half the size of a float32 copy
         npy_path = ECG_DIR / f"{event_id}.npy"
-        np.save(npy_path, full_ecg.astype(np.float32))
-        
-        # Insert metadata into database
-        cursor.execute("""
-            INSERT INTO events (event_id, patient_id, event_name, is_rejected, start_sample, ecg_path)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (event_id, patient_id, event_name, is_rejected, start_sample, str(npy_path)))
-        
-        print("✓ done")
-        return True
-        
+        np.save(npy_path, full_ecg)
+
+        # Also bake the display-resolution slice so the API can serve it
+        # without loading and striding the full array per request
+        display_path = ECG_DIR / f"{event_id}_ds{DOWNSAMPLE_FACTOR}.npy"
+        np.save(display_path, np.ascontiguousarray(full_ecg[::DOWNSAMPLE_FACTOR]))
+
+        return (event_id, patient_id, event_name, is_rejected, start_sample,
+                str(npy_path), str(display_path))
+
     except Exception as e:
-        print(f"✗ failed: {e}")
-        return False
+        print(f"✗ {event_id} failed: {e}")
+        return None
 
 
 # ============================================================================
@@ -207,14 +230,34 @@ def main():
     
     print(f"\nFound {total_events} events to process\n")
     
-    # Process each event
+    # Process events in parallel: workers handle parsing + .npy saving,
+    # the main process batches the SQLite inserts. All inserts run in a
+    # single transaction (`with conn:`) so SQLite fsyncs once at the end
+    # instead of once per statement.
     success_count = 0
-    for idx, json_path in enumerate(json_files, start=1):
-        if process_event(json_path, cur, idx):
-            success_count += 1
-    
-    # Commit and close database
-    conn.commit()
+    rows_batch = []
+    insert_sql = """
+        INSERT INTO events (event_id, patient_id, event_name, is_rejected, start_sample, ecg_path, ecg_display_path)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """
+
+    with conn:
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            futures = [executor.submit(process_event, json_path) for json_path in json_files]
+            for idx, future in enumerate(as_completed(futures), start=1):
+                row = future.result()
+                if row is None:
+                    continue
+                print(f"[{idx}/{total_events}] Processed event {row[0]} (start={row[4]}) ✓")
+                success_count += 1
+                rows_batch.append(row)
+                if len(rows_batch) >= INSERT_BATCH_SIZE:
+                    cur.executemany(insert_sql, rows_batch)
+                    rows_batch.clear()
+
+        if rows_batch:
+            cur.executemany(insert_sql, rows_batch)
+
     conn.close()
     
     # Print summary
@@ -16,6 +16,18 @@ interface EventData {
   start_sample_display: number
 }
 
+interface EventMetadata {
+  event_id: string
+  patient_id: string
+  ground_truth: string
+  is_rejected: boolean
+  predicted: string
+  confidence: number
+  ecg_url: string
+  display_sample_rate: number
+  start_sample_display: number
+}
+
 export function EventDetails() {
   const { eventId } = useParams<{ eventId: string }>()
   const [eventData, setEventData] = React.useState<EventData | null>(null)
@@ -25,12 +37,25 @@ export function EventDetails() {
   React.useEffect(() => {
     const fetchEventDetails = async () => {
       try {
-        const response = await fetch(`http://127.0.0.1:8000/event/${eventId}`)
-        if (!response.ok) {
+        // Metadata comes as JSON; the waveform is a raw int16 buffer
+        const [metaResponse, ecgResponse] = await Promise.all([
+          fetch(`http://127.0.0.1:8000/event/${eventId}`),
+          fetch(`http://127.0.0.1:8000/event/${eventId}/ecg.bin`),
+        ])
+        if (!metaResponse.ok || !ecgResponse.ok) {
           throw new Error('Failed to fetch event details')
         }
-        const data = await response.json()
-        setEventData(data)
+        const meta: EventMetadata = await metaResponse.json()
+        const samples = new Int16Array(await ecgResponse.arrayBuffer())
+
+        // Rebuild the [[ch1, ch2], ...] rows and time axis client-side
+        const ecg: number[][] = []
+        for (let i = 0; i < samples.length; i += 2) {
+          ecg.push([samples[i], samples[i + 1]])
+        }
+        const time_seconds = ecg.map((_, i) => i / meta.display_sample_rate)
+
+        setEventData({ ...meta, ecg, time_seconds })
       } catch (err) {
         setError(err instanceof Error ? err.message : 'An error occurred')
       } finally {